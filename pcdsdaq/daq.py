@@ -4,9 +4,10 @@ This module defines a control interface for the LCLS1 DAQ.
 import enum
 import functools
 import logging
-import os
-import time
+import socket
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
 
 from ophyd.status import Status
@@ -17,15 +18,27 @@ from .ami import set_ami_hutch, set_pyami_filter, set_monitor_det
 
 logger = logging.getLogger(__name__)
 pydaq = None
+# The host does not change while we run, look it up once
+_HOSTNAME = socket.gethostname()
 
 # Wait up to this many seconds for daq to be ready for a begin call
 BEGIN_TIMEOUT = 15
 # Do not allow begins within this many seconds of a stop
 BEGIN_THROTTLE = 1
+# While waiting to begin, check the daq state this often in seconds
+BEGIN_POLL_INTERVAL = 0.01
+# Give a platform this many seconds to answer before also probing the next
+CONNECT_PROBE_GRACE = 0.5
+# Reuse the last state reported by the daq for up to this many seconds
+STATE_CACHE_TTL = 0.01
+# Reuse the last run number lookup for up to this many seconds
+RUN_NUMBER_TTL = 0.5
 
 # Not-None sentinal for default value when None has a special meaning
 # Indicates that the last configured value should be used
 _CONFIG_VAL = object()
+# Values that mean "not given", built once instead of in every check
+_NONE_OR_CONFIG_VAL = (None, _CONFIG_VAL)
 
 
 def check_connect(f):
@@ -34,11 +47,11 @@ def check_connect(f):
     """
     @functools.wraps(f)
     def wrapper(self, *args, **kwargs):
-        logger.debug('Checking for daq connection')
-        if not self.connected:
-            msg = 'DAQ is not connected. Attempting to connect...'
-            logger.info(msg)
-            self.connect()
+        # Already connected: skip the logging and go straight to the method
+        if self._control is not None:
+            return f(self, *args, **kwargs)
+        logger.info('DAQ is not connected. Attempting to connect...')
+        self.connect()
         if self.connected:
             logger.debug('Daq is connected')
             return f(self, *args, **kwargs)
@@ -81,6 +94,8 @@ class Daq:
     _state_enum = enum.Enum('PydaqState',
                             'Disconnected Connected Configured Open Running',
                             start=0)
+    # State names indexed by the integer that pydaq reports
+    _state_names = tuple(state.name for state in _state_enum)
     default_config = dict(events=None,
                           duration=None,
                           use_l3t=False,
@@ -95,10 +110,14 @@ class Daq:
             globals()['pydaq'] = import_module('pydaq')
         super().__init__()
         self._control = None
+        self._state_cache = None
+        # Bumped whenever the state cache is cleared, see _read_state
+        self._state_generation = 0
+        self._state_lock = threading.Lock()
         self._config = None
         self._desired_config = {}
         self._reset_begin()
-        self._host = os.uname()[1]
+        self._host = _HOSTNAME
         self._RE = RE
         self._re_cbid = None
         self._config_ts = {}
@@ -106,6 +125,17 @@ class Daq:
         self._pre_run_state = None
         self._last_stop = 0
         self._check_run_number_has_failed = False
+        # (hutch, live) -> (run number, time.monotonic() of lookup)
+        self._run_number_cache = {}
+        # Reused for begin(end_run=True) instead of a new thread per call
+        self._ender_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='daq-ender')
+        # Reused for the begin sequence of every kickoff
+        self._kickoff_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='daq-kickoff')
+        # Reused to wait for the end of acquisition for every end status
+        self._finish_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='daq-finish')
         self.hutch_name = hutch_name
         register_daq(self)
 
@@ -134,6 +164,17 @@ class Daq:
         else:
             return self.default_config.copy()
 
+    @property
+    def _current_config(self):
+        """
+        The current configuration, without the copy made by `config`.
+
+        This is for internal lookups on hot paths and must not be modified.
+        """
+        if self._config is not None:
+            return self._config
+        return self.default_config
+
     @property
     def next_config(self):
         """
@@ -155,14 +196,42 @@ class Daq:
         - ``Configured``:   Connected, and the daq has been configured
         - ``Open``:         We are in the middle of a run
         - ``Running``:      We are collecting data in a run
+
+        Repeated reads within ``STATE_CACHE_TTL`` seconds share one query to
+        the daq. The cache is cleared by every transition requested here.
         """
         if self.connected:
-            logger.debug('calling Daq.control.state()')
-            num = self._control.state()
-            return self._state_enum(num).name
+            cache = self._state_cache
+            if cache is not None:
+                timestamp, state = cache
+                if time.monotonic() - timestamp < STATE_CACHE_TTL:
+                    return state
+            return self._read_state()
         else:
             return 'Disconnected'
 
+    def _read_state(self):
+        """
+        Ask the daq for its state, skipping and refreshing the state cache.
+        """
+        logger.debug('calling Daq.control.state()')
+        generation = self._state_generation
+        timestamp = time.monotonic()
+        state = self._state_names[self._control.state()]
+        with self._state_lock:
+            # Do not cache a reading from before a transition we made
+            if generation == self._state_generation:
+                self._state_cache = (timestamp, state)
+        return state
+
+    def _clear_state_cache(self):
+        """
+        Forget the cached state, and any reading of it already in progress.
+        """
+        with self._state_lock:
+            self._state_generation += 1
+            self._state_cache = None
+
     # Interactive methods
     def connect(self):
         """
@@ -174,22 +243,52 @@ class Daq:
         err = False
         conn = False
         if self._control is None:
-            for plat in range(6):
+            # Probe the platforms in order, but if one is slow to answer
+            # also start on the next one so failed probes do not add up
+            started = [threading.Event() for plat in range(6)]
+            finished = [threading.Event() for plat in range(6)]
+            found = threading.Event()
+
+            def probe(plat):
                 try:
-                    logger.debug(('instantiate Daq.control '
-                                  '= pydaq.Control(%s, %s)'),
-                                 self._host, plat)
-                    self._control = pydaq.Control(self._host, platform=plat)
-                    logger.debug('Daq.control.connect()')
-                    self._control.connect()
-                    logger.info('Connected to DAQ')
-                    conn = True
-                    break
+                    if plat:
+                        started[plat - 1].wait()
+                        finished[plat - 1].wait(CONNECT_PROBE_GRACE)
+                    started[plat].set()
+                    # Never open a session above a platform that connected
+                    if found.is_set():
+                        return None
+                    control = self._connect_platform(plat)
+                    found.set()
+                    return control
+                finally:
+                    started[plat].set()
+                    finished[plat].set()
+
+            executor = ThreadPoolExecutor(max_workers=6,
+                                          thread_name_prefix='daq-connect')
+            futures = [executor.submit(probe, plat) for plat in range(6)]
+            # Slow probes above the winner must not hold up connect
+            executor.shutdown(wait=False)
+            # Use the lowest platform that connected, like a serial probe
+            for plat, future in enumerate(futures):
+                if conn:
+                    future.add_done_callback(
+                        functools.partial(self._release_probe, plat))
+                    continue
+                try:
+                    control = future.result()
                 except Exception as exc:
                     if 'query' in str(exc):
                         err = True
                         logger.error(('Failed to connect: DAQ is not '
                                       'allocated!'))
+                    continue
+                if control is not None:
+                    self._control = control
+                    self._clear_state_cache()
+                    logger.info('Connected to DAQ')
+                    conn = True
             if not (err or conn):
                 err = True
                 logger.error(('Failed to connect: DAQ is not running on this '
@@ -201,6 +300,36 @@ class Daq:
         else:
             logger.info('Connect requested, but already connected to DAQ')
 
+    def _connect_platform(self, plat):
+        """
+        Return a ``pydaq.Control`` connected on platform ``plat``.
+
+        This raises if the daq cannot be reached on that platform.
+        """
+        logger.debug(('instantiate Daq.control '
+                      '= pydaq.Control(%s, %s)'),
+                     self._host, plat)
+        control = pydaq.Control(self._host, platform=plat)
+        logger.debug('Daq.control.connect()')
+        control.connect()
+        return control
+
+    def _release_probe(self, plat, future):
+        """
+        Release a ``pydaq.Control`` from a probe in `connect` we did not use.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        control = future.result()
+        if control is None:
+            return
+        logger.debug('Releasing extra connection on platform %s', plat)
+        try:
+            control.disconnect()
+        except Exception:
+            logger.debug('Failed to release platform %s', plat,
+                         exc_info=True)
+
     def disconnect(self):
         """
         Disconnect from the live DAQ, giving control back to the GUI.
@@ -213,8 +342,10 @@ class Daq:
             self._control.disconnect()
         del self._control
         self._control = None
+        self._clear_state_cache()
         self._desired_config = self._config or {}
         self._config = None
+        self._update_infinite_run()
         logger.info('DAQ is disconnected.')
 
     @check_connect
@@ -291,28 +422,31 @@ class Daq:
                       'use_l3t=%s, controls=%s, wait=%s)'),
                      events, duration, record, use_l3t, controls, wait)
         try:
-            if record is not _CONFIG_VAL and record != self.record:
-                old_record = self.record
-                self.preconfig(record=record, show_queued_cfg=False)
+            if record is not _CONFIG_VAL:
+                current_record = self.record
+                if record != current_record:
+                    old_record = current_record
+                    self.preconfig(record=record, show_queued_cfg=False)
             begin_status = self.kickoff(events=events, duration=duration,
                                         use_l3t=use_l3t, controls=controls)
+            begin_timeout = self._begin_timeout
             try:
-                begin_status.wait(timeout=self._begin_timeout)
+                begin_status.wait(timeout=begin_timeout)
             except (StatusTimeoutError, WaitTimeoutError):
-                msg = (f'Timeout after {self._begin_timeout} seconds waiting '
+                msg = (f'Timeout after {begin_timeout} seconds waiting '
                        'for daq to begin.')
                 raise DaqTimeoutError(msg) from None
 
             # In some daq configurations the begin status returns very early,
             # so we allow the user to configure an emperically derived extra
             # sleep.
-            time.sleep(self.config['begin_sleep'])
+            time.sleep(self._current_config['begin_sleep'])
             if wait:
                 self.wait()
                 if end_run:
                     self.end_run()
             if end_run and not wait:
-                threading.Thread(target=self._ender_thread, args=()).start()
+                self._ender_executor.submit(self._ender_thread)
         except KeyboardInterrupt:
             self.end_run()
             logger.info('%s.begin interrupted, ending run', self.name)
@@ -338,8 +472,12 @@ class Daq:
         """
         End the run when the daq stops aquiring
         """
-        self.wait()
-        self.end_run()
+        try:
+            self.wait()
+            self.end_run()
+        except Exception:
+            # Nothing collects the executor's future, so report here
+            logger.exception('Failed to end the run after acquiring')
 
     @check_connect
     def stop(self):
@@ -348,6 +486,8 @@ class Daq:
         """
         logger.debug('Daq.stop()')
         self._control.stop()
+        self._clear_state_cache()
+        self._run_number_cache.clear()
         self._reset_begin()
         self._last_stop = time.time()
 
@@ -357,8 +497,13 @@ class Daq:
         Call `stop`, then mark the run as finished.
         """
         logger.debug('Daq.end_run()')
-        self.stop()
+        # Same as stop, inlined to send both requests after one check_connect
+        self._control.stop()
+        self._reset_begin()
+        self._last_stop = time.time()
         self._control.endrun()
+        self._clear_state_cache()
+        self._run_number_cache.clear()
 
     # Reader interface
     @check_connect
@@ -434,9 +579,10 @@ class Daq:
                 logger.debug(err, exc_info=True)
                 raise StateTransitionError(err)
 
-        check_run_number = all((self.state == 'Configured',
-                                self.config['record'],
-                                not self._check_run_number_has_failed))
+        # Check the cheap conditions first to skip the state query
+        check_run_number = (self._current_config['record']
+                            and not self._check_run_number_has_failed
+                            and self.state == 'Configured')
         if check_run_number:
             try:
                 prev_run = self.run_number()
@@ -452,45 +598,56 @@ class Daq:
 
         def start_thread(control, status, events, duration, use_l3t, controls,
                          run_number):
-            tmo = self._begin_timeout
-            dt = 0.1
-            logger.debug('Make sure daq is ready to begin')
-            # Stop and start if we already started
-            if self.state in ('Open', 'Running'):
-                self.stop()
-            # It can take up to 0.4s after a previous begin to be ready
-            while tmo > 0:
-                if self.state in ('Configured', 'Open'):
-                    break
+            try:
+                # Local names for the lookups repeated in the polling loop
+                read_state = self._read_state
+                monotonic = time.monotonic
+                sleep = time.sleep
+                poll_interval = BEGIN_POLL_INTERVAL
+
+                deadline = monotonic() + self._begin_timeout
+                logger.debug('Make sure daq is ready to begin')
+                # Stop and start if we already started
+                if read_state() in ('Open', 'Running'):
+                    self.stop()
+                # It can take up to 0.4s after a previous begin to be ready
+                while True:
+                    ready = read_state() in ('Configured', 'Open')
+                    if ready or monotonic() >= deadline:
+                        break
+                    sleep(poll_interval)
+                if ready:
+                    begin_args = self._begin_args(events, duration, use_l3t,
+                                                  controls)
+                    if run_number is not None:
+                        logger.info('Beginning daq run %s', run_number)
+
+                    logger.debug('daq.control.begin(%s)', begin_args)
+                    dt = time.time() - self._last_stop
+                    tmo = BEGIN_THROTTLE - dt
+                    if tmo > 0:
+                        time.sleep(tmo)
+                    control.begin(**begin_args)
+                    self._clear_state_cache()
+                    self._run_number_cache.clear()
+                    # Cache these so we know what the latest begin was told
+                    self._begin = dict(events=events, duration=duration,
+                                       use_l3t=use_l3t, controls=controls)
+                    self._update_infinite_run()
+                    logger.debug('Marking kickoff as complete')
+                    status.set_finished()
                 else:
-                    tmo -= dt
-            if self.state in ('Configured', 'Open'):
-                begin_args = self._begin_args(events, duration, use_l3t,
-                                              controls)
-                if run_number is not None:
-                    logger.info('Beginning daq run %s', run_number)
-
-                logger.debug('daq.control.begin(%s)', begin_args)
-                dt = time.time() - self._last_stop
-                tmo = BEGIN_THROTTLE - dt
-                if tmo > 0:
-                    time.sleep(tmo)
-                control.begin(**begin_args)
-                # Cache these so we know what the most recent begin was told
-                self._begin = dict(events=events, duration=duration,
-                                   use_l3t=use_l3t, controls=controls)
-                logger.debug('Marking kickoff as complete')
-                status.set_finished()
-            else:
-                logger.debug('Marking kickoff as failed')
-                status.set_exception(RuntimeError('Daq begin failed!'))
+                    logger.debug('Marking kickoff as failed')
+                    status.set_exception(RuntimeError('Daq begin failed!'))
+            except Exception as exc:
+                # Nothing else watches this worker, report through the status
+                logger.debug('Exception in kickoff', exc_info=True)
+                status.set_exception(exc)
 
         begin_status = Status(obj=self)
-        watcher = threading.Thread(target=start_thread,
-                                   args=(self._control, begin_status, events,
-                                         duration, use_l3t, controls,
-                                         next_run))
-        watcher.start()
+        self._kickoff_executor.submit(start_thread, self._control,
+                                      begin_status, events, duration,
+                                      use_l3t, controls, next_run)
         return begin_status
 
     def complete(self):
@@ -538,14 +695,20 @@ class Daq:
                     control.end()
                 except RuntimeError:
                     pass  # This means we aren't running, so no need to wait
+                except Exception as exc:
+                    # Nothing else watches this worker, report through status
+                    logger.debug('Exception in Daq.control.end()',
+                                 exc_info=True)
+                    status.set_exception(exc)
+                    return
+                self._clear_state_cache()
                 self._last_stop = time.time()
                 self._reset_begin()
                 status.set_finished()
                 logger.debug('Marked acquisition as complete')
             end_status = Status(obj=self)
-            watcher = threading.Thread(target=finish_thread,
-                                       args=(self._control, end_status))
-            watcher.start()
+            self._finish_executor.submit(finish_thread, self._control,
+                                         end_status)
             return end_status
         else:
             # Configured to run forever, say we're done so we can wait for just
@@ -704,15 +867,18 @@ class Daq:
             logger.debug('Daq.control.configure(%s)',
                          config_args)
             self._control.configure(**config_args)
+            self._clear_state_cache()
             # self._config should reflect exactly the arguments to configure,
             # this is different than the arguments that pydaq.Control expects
             self._config = dict(events=events, duration=duration,
                                 record=record, use_l3t=use_l3t,
                                 controls=controls, begin_sleep=begin_sleep)
+            self._update_infinite_run()
             self._update_config_ts()
             self.config_info(header='Daq configured:')
         except Exception as exc:
             self._config = None
+            self._update_infinite_run()
             msg = 'Failed to configure!'
             logger.debug(msg, exc_info=True)
             raise RuntimeError(msg) from exc
@@ -735,8 +901,11 @@ class Daq:
         header: ``str``, optional
             A prefix for the config line.
         """
+        # Skip building the message if nobody will see it
+        if not logger.isEnabledFor(logging.INFO):
+            return
         if config is None:
-            config = self.config
+            config = self._current_config
 
         txt = []
         for key, value in config.items():
@@ -765,12 +934,14 @@ class Daq:
         """
         Create timestamps and update the ``bluesky`` readback for
         `read_configuration`
+
+        Keys whose values did not change keep their previous timestamps.
         """
-        for k, v in self.config.items():
-            old_value = self._config_ts.get(k, {}).get('value')
-            if old_value is None or v != old_value:
-                self._config_ts[k] = dict(value=v,
-                                          timestamp=time.time())
+        now = time.time()
+        for k, v in self._current_config.items():
+            old = self._config_ts.get(k)
+            if old is None or v != old['value']:
+                self._config_ts[k] = dict(value=v, timestamp=now)
 
     def _config_args(self, record, use_l3t, controls):
         """
@@ -815,10 +986,12 @@ class Daq:
                 val = device.position
             except AttributeError:
                 val = device.get()
-            try:
-                val = val[0]
-            except Exception:
-                pass
+            # Plain numbers are the common case, skip the failed val[0]
+            if not isinstance(val, (int, float)):
+                try:
+                    val = val[0]
+                except Exception:
+                    pass
             ctrl_arg.append((name, val))
         return ctrl_arg
 
@@ -834,20 +1007,21 @@ class Daq:
         logger.debug('Daq._begin_args(%s, %s, %s, %s)',
                      events, duration, use_l3t, controls)
         begin_args = {}
+        config = self._current_config
         # Handle default args for events and duration
         if events is _CONFIG_VAL and duration is _CONFIG_VAL:
             # If both are omitted, use last configured values
-            events = self.config['events']
-            duration = self.config['duration']
-        if events not in (None, _CONFIG_VAL):
+            events = config['events']
+            duration = config['duration']
+        if events not in _NONE_OR_CONFIG_VAL:
             # We either passed the events arg, or loaded from config
-            if use_l3t in (None, _CONFIG_VAL) and self.configured:
-                use_l3t = self.config['use_l3t']
+            if use_l3t in _NONE_OR_CONFIG_VAL and self.configured:
+                use_l3t = config['use_l3t']
             if use_l3t:
                 begin_args['l3t_events'] = events
             else:
                 begin_args['events'] = events
-        elif duration not in (None, _CONFIG_VAL):
+        elif duration not in _NONE_OR_CONFIG_VAL:
             # We either passed the duration arg, or loaded from config
             secs = int(duration)
             nsec = int((duration - secs) * 1e9)
@@ -856,13 +1030,13 @@ class Daq:
             # We passed None somewhere/everywhere
             begin_args['events'] = 0  # Run until manual stop
         if controls is _CONFIG_VAL:
-            controls = self.config['controls']
+            controls = config['controls']
         if controls is not None:
             begin_args['controls'] = self._ctrl_arg(controls)
         return begin_args
 
     def _check_duration(self, duration):
-        if duration not in (None, _CONFIG_VAL) and duration < 1:
+        if duration not in _NONE_OR_CONFIG_VAL and duration < 1:
             msg = ('Duration argument less than 1 is unreliable. Please '
                    'use the events argument to specify the length of '
                    'very short runs.')
@@ -893,7 +1067,7 @@ class Daq:
         """
         logger.debug('Daq.describe_configuration()')
         try:
-            controls_shape = [len(self.config['controls']), 2]
+            controls_shape = [len(self._current_config['controls']), 2]
         except (TypeError, RuntimeError, AttributeError):
             controls_shape = []
         return dict(events=dict(source='daq_events_in_run',
@@ -994,7 +1168,7 @@ class Daq:
         """
         events = self._begin['events']
         if events is _CONFIG_VAL:
-            events = self.config['events']
+            events = self._current_config['events']
         return events
 
     @property
@@ -1005,14 +1179,21 @@ class Daq:
         """
         duration = self._begin['duration']
         if duration is _CONFIG_VAL:
-            duration = self.config['duration']
+            duration = self._current_config['duration']
         return duration
 
-    @property
-    def _infinite_run(self):
-        if self._events is None and self._duration is None:
-            return True
-        return self._events in (-1, 0)
+    def _update_infinite_run(self):
+        """
+        Cache in ``_infinite_run`` whether the current `begin` cycle is set to
+        run until stopped.
+
+        This must be called whenever ``_begin`` or the configuration changes.
+        """
+        events = self._events
+        if events is None and self._duration is None:
+            self._infinite_run = True
+        else:
+            self._infinite_run = events in (-1, 0)
 
     def _reset_begin(self):
         """
@@ -1020,6 +1201,7 @@ class Daq:
         """
         self._begin = dict(events=None, duration=None, use_l3t=None,
                            controls=None)
+        self._update_infinite_run()
 
     def run_number(self, hutch_name=None):
         """
@@ -1034,6 +1216,9 @@ class Daq:
         instant check. It can also display log messages, which would be
         annoying on tab complete.
 
+        Repeated calls within ``RUN_NUMBER_TTL`` seconds reuse the last
+        result, unless a run has begun or stopped in the meantime.
+
         Parameters
         ----------
         hutch_name: ``str``, optional
@@ -1063,10 +1248,17 @@ class Daq:
                                   'mec', 'tst'):
                 raise ValueError(('{} is not a valid hutch, cannot determine '
                                   'run number'.format(hutch_name)))
-            if self.state in ('Open', 'Running') and self.config['record']:
-                return ext_scripts.get_run_number(hutch=hutch_name, live=True)
-            else:
-                return ext_scripts.get_run_number(hutch=hutch_name, live=False)
+            recording = self._current_config['record']
+            live = bool(recording and self.state in ('Open', 'Running'))
+            key = (hutch_name, live)
+            now = time.monotonic()
+            cached = self._run_number_cache.get(key)
+            if cached is not None and now - cached[1] < RUN_NUMBER_TTL:
+                return cached[0]
+            run_number = ext_scripts.get_run_number(hutch=hutch_name,
+                                                    live=live)
+            self._run_number_cache[key] = (run_number, now)
+            return run_number
         except FileNotFoundError:
             raise RuntimeError('No nfs access, cannot determine run number.')
 
@@ -1075,6 +1267,12 @@ class Daq:
             self.disconnect()
         except Exception:
             pass
+        try:
+            self._ender_executor.shutdown(wait=False)
+            self._kickoff_executor.shutdown(wait=False)
+            self._finish_executor.shutdown(wait=False)
+        except Exception:
+            pass
 
     def set_filter(self, *args, event_codes=None, operator='&',
                    or_bykik=False):
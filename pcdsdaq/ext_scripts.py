@@ -2,6 +2,7 @@ import logging
 import re
 import socket
 import subprocess
+import time
 
 
 logger = logging.getLogger(__name__)
@@ -9,6 +10,14 @@ CNF = '/reg/g/pcds/dist/pds/{0}/scripts/{0}.cnf'
 SCRIPTS = '/reg/g/pcds/engineering_tools/{}/scripts/{}'
 TOOLS = '/reg/g/pcds/dist/pds/tools/{}/{}'
 
+# Patterns for parsing the procmgr output in get_ami_proxy
+DOMAIN_RE = re.compile(r'\.pcdsn$')
+# [^\S\n] is whitespace within a line, this is searched over all the output
+PROXY_RE = re.compile(r'ami_proxy.+-I[^\S\n]+(?P<proxy>\S+)[^\S\n]')
+IP_RE = re.compile(r'\d+\.\d+\.\d+\.\d+')
+# Reuse reverse DNS lookups for this many seconds
+DNS_TTL = 300
+
 
 def call_script(args, timeout=None, ignore_return_code=False):
     logger.debug('Calling external script %s with timeout=%s,'
@@ -28,6 +37,8 @@ def call_script(args, timeout=None, ignore_return_code=False):
 
 
 cache = {}
+# ip -> (monotonic time, host name) for reverse_lookup
+dns_cache = {}
 
 
 def cache_script(args, timeout=None, ignore_return_code=False):
@@ -42,8 +53,30 @@ def cache_script(args, timeout=None, ignore_return_code=False):
 
 
 def clear_script_cache():
-    global cache
+    global cache, dns_cache
     cache = {}
+    dns_cache = {}
+
+
+def reverse_lookup(ip, ttl=None):
+    """
+    Return the host name for ``ip``.
+
+    Lookups less than ``ttl`` seconds old are reused instead of asking DNS.
+    ``ttl`` defaults to `DNS_TTL`.
+    """
+    if ttl is None:
+        ttl = DNS_TTL
+    now = time.monotonic()
+    try:
+        timestamp, host = dns_cache[ip]
+        if now - timestamp < ttl:
+            return host
+    except KeyError:
+        pass
+    host, _, _ = socket.gethostbyaddr(ip)
+    dns_cache[ip] = (now, host)
+    return host
 
 
 def get_hutch_name(timeout=10):
@@ -79,21 +112,18 @@ def get_ami_proxy(hutch, timeout=10):
     this does not seem to be consistent with what the old hutch python is
     doing, so I will continue to searching for -I here.
     """
-    domain_re = re.compile('.pcdsn$')
-    proxy_re = re.compile(r'ami_proxy.+-I\s+(?P<proxy>\S+)\s')
-    ip_re = re.compile(r'\d+\.\d+\.\d+\.\d+')
     hutch = hutch.lower()
     cnf = CNF.format(hutch)
     procmgr = TOOLS.format('procmgr', 'procmgr')
     output = cache_script([procmgr, 'status', cnf, 'ami_proxy'],
                           timeout=timeout,
                           ignore_return_code=True)
-    for line in output.split('\n'):
-        proxy_match = proxy_re.search(line)
-        if proxy_match:
-            ami_proxy = proxy_match.group('proxy')
-            ip_match = ip_re.match(ami_proxy)
-            if ip_match:
-                domain_name, _, _ = socket.gethostbyaddr(ami_proxy)
-                ami_proxy = domain_re.sub('', domain_name)
-            return ami_proxy
+    # Without re.DOTALL, .+ cannot run past the end of a line either
+    proxy_match = PROXY_RE.search(output)
+    if proxy_match:
+        ami_proxy = proxy_match.group('proxy')
+        ip_match = IP_RE.match(ami_proxy)
+        if ip_match:
+            domain_name = reverse_lookup(ami_proxy)
+            ami_proxy = DOMAIN_RE.sub('', domain_name)
+        return ami_proxy
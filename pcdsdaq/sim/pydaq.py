@@ -122,7 +122,9 @@ class Control:
                 delay = self._begin_delay
                 self._begin_delay = 0
                 time.sleep(delay)
-            thr = threading.Thread(target=self._begin_thread, args=(dur,))
+            # Daemon so an open-ended simulated run cannot block exit
+            thr = threading.Thread(target=self._begin_thread, args=(dur,),
+                                   name='sim-daq-run', daemon=True)
             thr.start()
 
     def _pick_duration(self, events, l1t_events, l3t_events, duration):
@@ -171,14 +173,11 @@ class Control:
     def _begin_thread(self, duration):
         logger.debug('SimControl._begin_thread(%s)', duration)
         start = time.time()
-        initial_duration = duration
-        interrupted = False
-        dt = 0.1
-        while duration > 0:
-            duration -= dt
-            if self._done_flag.wait(dt):
-                interrupted = True
-                break
+        # Sleep through the whole run at once, stop and endrun wake us early
+        if duration == float('inf'):
+            interrupted = self._done_flag.wait()
+        else:
+            interrupted = self._done_flag.wait(duration)
         if not interrupted:
             try:
                 self.stop()
@@ -186,7 +185,7 @@ class Control:
                 pass
         end = time.time()
         logger.debug('%ss elapsed in SimControl._begin_thread(%s)',
-                     end-start, initial_duration)
+                     end-start, duration)
 
     def end(self):
         logger.debug('SimControl.end()')
@@ -14,6 +14,18 @@ from pcdsdaq.sim.pydaq import SimNoDaq
 import pytest
 
 
+def pytest_collection_modifyitems(config, items):
+    """
+    Skip every test that needs the daq fixture on windows, once at collection.
+    """
+    if sys.platform != 'win32':
+        return
+    skip_daq = pytest.mark.skip(reason='Cannot make DAQ on windows')
+    for item in items:
+        if 'daq' in getattr(item, 'fixturenames', ()):
+            item.add_marker(skip_daq)
+
+
 @pytest.fixture(scope='function')
 def reset():
     ami_reset_globals()
@@ -31,10 +43,9 @@ def nosim(reset):
 
 @pytest.fixture(scope='function')
 def daq(RE, sim):
-    if sys.platform == 'win32':
-        pytest.skip('Cannot make DAQ on windows')
     sim_pydaq.conn_err = None
     daq_module.BEGIN_THROTTLE = 0
+    daq_module.BEGIN_POLL_INTERVAL = 0.001
     daq = Daq(RE=RE)
     yield daq
     try:
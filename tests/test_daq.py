@@ -14,7 +14,7 @@ from ophyd.status import wait as status_wait
 import pcdsdaq.sim.pydaq as sim_pydaq
 import pcdsdaq.ext_scripts as ext
 from pcdsdaq import daq as daq_module
-from pcdsdaq.daq import BEGIN_TIMEOUT, StateTransitionError, DaqTimeoutError
+from pcdsdaq.daq import StateTransitionError, DaqTimeoutError
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +46,82 @@ def test_connect_errors(daq):
         daq.begin()
 
 
+def test_state_cache_race(daq):
+    logger.debug('test_state_cache_race')
+    daq.connect()
+    control_state = daq._control.state
+
+    def racing_state():
+        # A transition lands while the state is being read
+        daq._clear_state_cache()
+        return control_state()
+
+    daq._control.state = racing_state
+    assert daq._read_state() == 'Connected'
+    assert daq._state_cache is None
+    daq._control.state = control_state
+    daq._read_state()
+    assert daq._state_cache is not None
+
+
+class SlowControl:
+    """
+    Fake pydaq.Control where some platforms are live and some are slow.
+    """
+    live = ()
+    slow = {}
+    calls = []
+
+    def __init__(self, host, platform=0):
+        self.platform = platform
+
+    def connect(self):
+        self.calls.append(('connect', self.platform))
+        time.sleep(self.slow.get(self.platform, 0))
+        if self.platform not in self.live:
+            raise RuntimeError('Connect failed')
+
+    def disconnect(self):
+        self.calls.append(('disconnect', self.platform))
+
+
+@pytest.mark.timeout(10)
+def test_connect_slow_probe(daq, monkeypatch):
+    logger.debug('test_connect_slow_probe')
+    monkeypatch.setattr(daq_module, 'CONNECT_PROBE_GRACE', 0.1)
+    monkeypatch.setattr(sim_pydaq, 'Control', SlowControl)
+    calls = []
+    monkeypatch.setattr(SlowControl, 'calls', calls)
+    # A slow platform above the winner does not hold up connect
+    monkeypatch.setattr(SlowControl, 'live', (0, 3))
+    monkeypatch.setattr(SlowControl, 'slow', {1: 3})
+    t0 = time.time()
+    daq.connect()
+    assert time.time() - t0 < 1
+    assert daq._control.platform == 0
+    assert calls == [('connect', 0)]
+    # A slow failure below the winner gets a head start, nothing above it
+    daq._control = None
+    calls.clear()
+    monkeypatch.setattr(SlowControl, 'live', (1, 3))
+    monkeypatch.setattr(SlowControl, 'slow', {0: 0.5})
+    daq.connect()
+    assert daq._control.platform == 1
+    assert calls == [('connect', 0), ('connect', 1)]
+    # A slow success below a faster one still wins, the other is released
+    daq._control = None
+    calls.clear()
+    monkeypatch.setattr(SlowControl, 'live', (0, 1))
+    monkeypatch.setattr(SlowControl, 'slow', {0: 0.5})
+    daq.connect()
+    assert daq._control.platform == 0
+    start = time.time()
+    while ('disconnect', 1) not in calls and time.time() - start < 2:
+        time.sleep(0.01)
+    assert calls == [('connect', 0), ('connect', 1), ('disconnect', 1)]
+    daq._control = None
+
+
 def test_disconnect(daq):
     """
     We expect disconnect to bring the daq from a connected state to a
@@ -102,6 +178,46 @@ def test_configure(daq, sig):
         prev_config = daq.read_configuration()
 
 
+def test_configure_keeps_timestamps(daq):
+    """
+    We expect values that did not change to keep their timestamps, including
+    values that are still None.
+    """
+    logger.debug('test_configure_keeps_timestamps')
+    daq.configure(events=120)
+    before = daq.read_configuration()
+    old, new = daq.configure(events=120)
+    assert new == before
+    assert new is not old
+    old, new = daq.configure(events=240)
+    assert new['events']['value'] == 240
+    assert new['duration'] == old['duration']
+
+
+class DummyArray:
+    name = 'dummy_array'
+    position = [5, 6]
+
+
+def test_ctrl_arg(daq, sig):
+    """
+    We expect control values to come from position, falling back to get, and
+    to take the first element of sequences, including on repeated calls.
+    """
+    logger.debug('test_ctrl_arg')
+    controls = dict(dummy=Dummy(), sig=sig, array=DummyArray())
+    expected = [('dummy', 4), ('sig', 0), ('array', 5)]
+    assert daq._ctrl_arg(controls) == expected
+    assert daq._ctrl_arg(controls) == expected
+    sig.put(1)
+    assert daq._ctrl_arg([sig]) == [('test', 1)]
+    # A value that starts as a scalar can later become an array
+    dummy = Dummy()
+    assert daq._ctrl_arg(dict(dummy=dummy)) == [('dummy', 4)]
+    dummy.position = [7, 8]
+    assert daq._ctrl_arg(dict(dummy=dummy)) == [('dummy', 7)]
+
+
 def test_disconnect_config(daq):
     logger.debug('test_disconnect_config')
 
@@ -135,7 +251,7 @@ def test_record(daq):
 
 
 @pytest.mark.timeout(10)
-def test_basic_run(daq, sig):
+def test_basic_run(daq, sig, monkeypatch):
     """
     We expect a begin without a configure to automatically configure
     We expect the daq to run for the time passed into begin
@@ -164,13 +280,14 @@ def test_basic_run(daq, sig):
     assert daq.state == 'Configured'
 
     # now we force the kickoff to time out
+    monkeypatch.setattr(daq_module, 'BEGIN_TIMEOUT', 1)
     daq._control._state = 'Disconnected'
     start = time.time()
-    status = daq.kickoff(duration=BEGIN_TIMEOUT+3)
+    status = daq.kickoff(duration=daq_module.BEGIN_TIMEOUT+3)
     with pytest.raises(RuntimeError):
-        status_wait(status, timeout=BEGIN_TIMEOUT+1)
+        status_wait(status, timeout=daq_module.BEGIN_TIMEOUT+1)
     dt = time.time() - start
-    assert dt < BEGIN_TIMEOUT + 1
+    assert dt < daq_module.BEGIN_TIMEOUT + 1
 
 
 @pytest.mark.timeout(10)
@@ -485,6 +602,24 @@ def test_run_number(daq, monkeypatch):
     daq.begin(events=100, record=True)
 
 
+def test_run_number_cache(daq, monkeypatch):
+    logger.debug('test_run_number_cache')
+    calls = []
+
+    def count_calls(hutch=None, live=False):
+        calls.append((hutch, live))
+        return 1
+
+    monkeypatch.setattr(ext, 'get_run_number', count_calls)
+    assert daq.run_number() == 1
+    assert daq.run_number() == 1
+    assert len(calls) == 1
+    # Starting a run should forget the old result
+    daq.begin(events=1, wait=True, end_run=True)
+    assert daq.run_number() == 1
+    assert len(calls) == 2
+
+
 def test_infinite_trigger_status(daq):
     logger.debug('test_infinite_trigger_status')
     daq.configure(events=0)
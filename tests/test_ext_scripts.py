@@ -42,6 +42,7 @@ def test_run_number(nosim, monkeypatch):
 
 def test_get_ami_proxy(monkeypatch):
     logger.debug('test_get_ami_proxy')
+    ext.clear_script_cache()
 
     def fake_procmgr(*args, **kwargs):
         return ("/reg/g/pcds/dist/pds/tools/procmgr/procmgr: using config "
@@ -67,3 +68,43 @@ def test_get_ami_proxy(monkeypatch):
     monkeypatch.setattr(socket, 'gethostbyaddr', fake_gethostbyaddr)
 
     assert ext.get_ami_proxy('tst') == 'tst-amiproxy'
+
+
+def test_get_ami_proxy_per_line(monkeypatch):
+    logger.debug('test_get_ami_proxy_per_line')
+    ext.clear_script_cache()
+    output = ("172.21.22.64  ami_proxy    RUNNING    7145   29118  "
+              "ami_proxy -I tst-proxy\n"
+              "ami_proxy -I\n"
+              "other -s 239.255.35.1\n")
+    monkeypatch.setattr(ext, 'call_script', lambda *args, **kwargs: output)
+    # A proxy must be followed by whitespace on its own line, as when the
+    # output was searched line by line
+    assert ext.get_ami_proxy('tst') is None
+
+
+def test_reverse_lookup_cache(monkeypatch):
+    logger.debug('test_reverse_lookup_cache')
+    ext.clear_script_cache()
+    lookups = []
+
+    def fake_gethostbyaddr(ip):
+        lookups.append(ip)
+        return ('tst-amiproxy.pcdsn', None, None)
+
+    monkeypatch.setattr(socket, 'gethostbyaddr', fake_gethostbyaddr)
+
+    ip = '172.21.38.64'
+    assert ext.reverse_lookup(ip) == 'tst-amiproxy.pcdsn'
+    assert ext.reverse_lookup(ip) == 'tst-amiproxy.pcdsn'
+    assert len(lookups) == 1
+    # Expired entries are looked up again
+    assert ext.reverse_lookup(ip, ttl=0) == 'tst-amiproxy.pcdsn'
+    assert len(lookups) == 2
+    ext.clear_script_cache()
+    ext.reverse_lookup(ip)
+    assert len(lookups) == 3
+    # The module ttl is read at call time, so it can be patched
+    monkeypatch.setattr(ext, 'DNS_TTL', 0)
+    ext.reverse_lookup(ip)
+    assert len(lookups) == 4